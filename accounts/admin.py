@@ -2,10 +2,13 @@
 
 from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
+from django.contrib.auth.models import Permission
 from django.core.exceptions import ValidationError
-from django.utils.html import format_html
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
 from .models import (
     CustomUser, 
     Friendship, 
@@ -15,6 +18,45 @@ from .models import (
 )
 
 
+# Changelist badges are rendered once per row; the fixed ones are built here
+# once so the list_display callables only escape the dynamic values.
+_ACTIVE_HTML = mark_safe('<span class="status-badge status-active">Active</span>')
+_INACTIVE_HTML = mark_safe('<span class="status-badge status-inactive">Inactive</span>')
+_SUPERUSER_HTML = mark_safe('<span class="role-badge role-superuser">Superuser</span>')
+_STAFF_HTML = mark_safe('<span class="role-badge role-staff">Staff</span>')
+_USER_HTML = mark_safe('<span class="role-badge role-user">User</span>')
+
+_STATUS_CSS = {
+    'pending': 'status-pending',
+    'accepted': 'status-accepted',
+    'approved': 'status-accepted',
+    'rejected': 'status-rejected',
+}
+
+
+class StatusBadgeMixin:
+    """
+    Adds a 'status_badge' list_display column for models with a status field.
+    Set status_choices to the model's StatusChoices; a badge for every value
+    is pre-rendered once, when the admin class is defined.
+    """
+    status_choices = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.status_badges = {
+            value: mark_safe('<span class="status-badge %s">%s</span>' % (_STATUS_CSS.get(value, ''), escape(label)))
+            for value, label in cls.status_choices.choices
+        }
+
+    def status_badge(self, obj):
+        badge = self.status_badges.get(obj.status)
+        if badge is None:
+            return format_html('<span class="status-badge">{}</span>', obj.status)
+        return badge
+    status_badge.short_description = 'Status'
+
+
 # Custom User Creation Form
 class CustomUserCreationForm(forms.ModelForm):
     password1 = forms.CharField(
@@ -103,10 +145,12 @@ class CustomUserAdmin(UserAdmin):
     
     search_fields = ('username', 'first_name', 'last_name')
     ordering = ('-date_joined',)
-    filter_horizontal = ('groups', 'user_permissions',)
+    filter_horizontal = ('groups',)
+    # Searched over AJAX instead of rendering every permission up front
+    autocomplete_fields = ('user_permissions',)
 
     def username_badge(self, obj):
-        return format_html('<span class="username-badge">{}</span>', obj.username)
+        return mark_safe('<span class="username-badge">' + escape(obj.username) + '</span>')
     username_badge.short_description = 'Username'
 
     def full_name(self, obj):
@@ -115,30 +159,62 @@ class CustomUserAdmin(UserAdmin):
     full_name.short_description = 'Full Name'
 
     def user_status(self, obj):
-        if obj.is_active:
-            return format_html('<span class="status-badge status-active">Active</span>')
-        return format_html('<span class="status-badge status-inactive">Inactive</span>')
+        return _ACTIVE_HTML if obj.is_active else _INACTIVE_HTML
     user_status.short_description = 'Status'
 
     def staff_badge(self, obj):
         if obj.is_superuser:
-            return format_html('<span class="role-badge role-superuser">Superuser</span>')
+            return _SUPERUSER_HTML
         elif obj.is_staff:
-            return format_html('<span class="role-badge role-staff">Staff</span>')
-        return format_html('<span class="role-badge role-user">User</span>')
+            return _STAFF_HTML
+        return _USER_HTML
     staff_badge.short_description = 'Role'
 
 
 admin.site.register(CustomUser, CustomUserAdmin)
 
 
+# Needed as the search target for CustomUserAdmin.autocomplete_fields.
+# Autocomplete only needs view permission, so this stays read-only and off the
+# admin index.
+@admin.register(Permission)
+class PermissionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'codename', 'content_type')
+    search_fields = ('name', 'codename', 'content_type__app_label')
+
+    def get_queryset(self, request):
+        # Permission.__str__ reads content_type for every autocomplete result
+        return super().get_queryset(request).select_related('content_type')
+
+    def has_module_permission(self, request):
+        return False
+
+    def has_view_permission(self, request, obj=None):
+        # Anyone who may edit users may search the permissions they assign
+        return (
+            super().has_view_permission(request, obj)
+            or request.user.has_perm('accounts.change_customuser')
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Friendship)
-class FriendshipAdmin(admin.ModelAdmin):
+class FriendshipAdmin(StatusBadgeMixin, admin.ModelAdmin):
     list_display = ('requester_display', 'receiver_display', 'status_badge', 'created_at', 'updated_at')
+    list_select_related = ('requester', 'receiver')
     list_filter = ('status', 'created_at')
     search_fields = ('requester__username', 'receiver__username')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at')
+    status_choices = Friendship.StatusChoices
     
     fieldsets = (
         ('Friend Request', {
@@ -151,34 +227,36 @@ class FriendshipAdmin(admin.ModelAdmin):
     )
 
     def requester_display(self, obj):
-        return format_html('<strong>{}</strong>', obj.requester.username)
+        return mark_safe('<strong>' + escape(obj.requester.username) + '</strong>')
     requester_display.short_description = 'Requester'
 
     def receiver_display(self, obj):
-        return format_html('<strong>{}</strong>', obj.receiver.username)
+        return mark_safe('<strong>' + escape(obj.receiver.username) + '</strong>')
     receiver_display.short_description = 'Receiver'
 
-    def status_badge(self, obj):
-        colors = {
-            'pending': 'status-pending',
-            'accepted': 'status-accepted',
-            'rejected': 'status-rejected'
-        }
-        return format_html(
-            '<span class="status-badge {}">{}</span>',
-            colors.get(obj.status, ''),
-            obj.get_status_display()
+
+class FriendTransactionChangeList(ChangeList):
+    def get_results(self, request):
+        # The list only renders these columns, so skip the description text and
+        # the rest of each joined user row. Actions query get_queryset() afresh
+        # and still load whole rows.
+        self.queryset = self.queryset.only(
+            'id', 'amount', 'status', 'created_at',
+            'initiator__username', 'friend__username', 'action_taken_by__username',
         )
-    status_badge.short_description = 'Status'
+        super().get_results(request)
 
 
 @admin.register(FriendTransaction)
-class FriendTransactionAdmin(admin.ModelAdmin):
+class FriendTransactionAdmin(StatusBadgeMixin, admin.ModelAdmin):
     list_display = ('transaction_summary', 'amount_display', 'status_badge', 'created_at', 'action_taken_by')
-    list_filter = ('status', 'created_at', 'initiator', 'friend')
+    list_select_related = ('initiator', 'friend', 'action_taken_by')
+    list_filter = ('status', 'created_at')
     search_fields = ('initiator__username', 'friend__username', 'description')
+    raw_id_fields = ('initiator', 'friend', 'action_taken_by')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at')
+    status_choices = FriendTransaction.StatusChoices
     
     fieldsets = (
         ('Transaction Details', {
@@ -194,34 +272,23 @@ class FriendTransactionAdmin(admin.ModelAdmin):
     )
 
     def transaction_summary(self, obj):
-        return format_html(
-            '<strong>{}</strong> ➜ <strong>{}</strong>',
-            obj.initiator.username,
-            obj.friend.username
+        return mark_safe(
+            '<strong>' + escape(obj.initiator.username) + '</strong> ➜ '
+            '<strong>' + escape(obj.friend.username) + '</strong>'
         )
     transaction_summary.short_description = 'Transaction'
 
     def amount_display(self, obj):
-        color = 'amount-positive' if obj.amount > 0 else 'amount-negative'
-        return format_html(
-            '<span class="{}">Rs {}</span>',
-            color,
-            abs(obj.amount)
-        )
+        # is_signed() reads the sign flag directly instead of coercing 0 to a Decimal
+        if obj.amount.is_signed():
+            color, value = 'amount-negative', -obj.amount
+        else:
+            color, value = 'amount-positive', obj.amount
+        return mark_safe('<span class="' + color + '">Rs ' + escape(value) + '</span>')
     amount_display.short_description = 'Amount'
 
-    def status_badge(self, obj):
-        colors = {
-            'pending': 'status-pending',
-            'accepted': 'status-accepted',
-            'rejected': 'status-rejected'
-        }
-        return format_html(
-            '<span class="status-badge {}">{}</span>',
-            colors.get(obj.status, ''),
-            obj.get_status_display()
-        )
-    status_badge.short_description = 'Status'
+    def get_changelist(self, request, **kwargs):
+        return FriendTransactionChangeList
 
     def get_readonly_fields(self, request, obj=None):
         if obj and obj.status != FriendTransaction.StatusChoices.PENDING:
@@ -231,46 +298,21 @@ class FriendTransactionAdmin(admin.ModelAdmin):
 
 
 @admin.register(TransactionDeleteRequest)
-class TransactionDeleteRequestAdmin(admin.ModelAdmin):
+class TransactionDeleteRequestAdmin(StatusBadgeMixin, admin.ModelAdmin):
     list_display = ['id', 'transaction', 'requester', 'status_badge', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['requester__username', 'transaction__id']
     readonly_fields = ['created_at', 'updated_at']
-    
-    def status_badge(self, obj):
-        colors = {
-            'pending': 'status-pending',
-            'approved': 'status-accepted',
-            'rejected': 'status-rejected'
-        }
-        return format_html(
-            '<span class="status-badge {}">{}</span>',
-            colors.get(obj.status, ''),
-            obj.get_status_display()
-        )
-    status_badge.short_description = 'Status'
-
+    status_choices = TransactionDeleteRequest.StatusChoices
 
 
 @admin.register(HistoryResetRequest)
-class HistoryResetRequestAdmin(admin.ModelAdmin):
+class HistoryResetRequestAdmin(StatusBadgeMixin, admin.ModelAdmin):
     list_display = ['id', 'requester', 'target_user', 'status_badge', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['requester__username', 'target_user__username']
     readonly_fields = ['created_at', 'updated_at']
-    
-    def status_badge(self, obj):
-        colors = {
-            'pending': 'status-pending',
-            'approved': 'status-accepted',
-            'rejected': 'status-rejected'
-        }
-        return format_html(
-            '<span class="status-badge {}">{}</span>',
-            colors.get(obj.status, ''),
-            obj.get_status_display()
-        )
-    status_badge.short_description = 'Status'
+    status_choices = HistoryResetRequest.StatusChoices
 
 
 # Customize admin site header and title
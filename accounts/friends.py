@@ -0,0 +1,33 @@
+# accounts/friends.py
+"""
+Per-user cache of the rendered friend list, dropped whenever one of the
+user's friendships changes. Invalidation only reaches other workers through
+a shared cache backend (see CACHES in settings).
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Friendship
+
+# Upper bound on staleness for anything the handlers below miss: a friend's
+# name edited in the admin, or any change at all if CACHES is per-process
+FRIEND_LIST_CACHE_TIMEOUT = 60  # seconds
+
+
+def friend_list_cache_key(user_id):
+    return f'friends:{user_id}'
+
+
+def forget_friend_lists(*user_ids):
+    """
+    Drop the cached friend lists of the given users. Call this after writes
+    that bypass model signals, such as QuerySet.update().
+    """
+    cache.delete_many([friend_list_cache_key(user_id) for user_id in user_ids])
+
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def forget_changed_friendship(sender, instance, **kwargs):
+    forget_friend_lists(instance.requester_id, instance.receiver_id)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-15 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_historyresetrequest_transactiondeleterequest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['receiver', 'status'], name='fs_receiver_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['requester', 'status'], name='fs_requester_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendtransaction',
+            index=models.Index(fields=['friend', 'status'], name='ft_friend_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendtransaction',
+            index=models.Index(fields=['initiator', 'status'], name='ft_initiator_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendtransaction',
+            index=models.Index(fields=['created_at'], name='ft_created_at_idx'),
+        ),
+    ]
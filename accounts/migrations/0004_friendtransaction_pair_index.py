@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_friendship_friendtransaction_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendtransaction',
+            index=models.Index(fields=['initiator', 'friend', 'status'], name='ft_pair_status_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Value, When
+
+
+def populate_user_pair(apps, schema_editor):
+    Friendship = apps.get_model('accounts', 'Friendship')
+    for friendship in Friendship.objects.only('requester_id', 'receiver_id').iterator():
+        friendship.user_low, friendship.user_high = sorted((friendship.requester_id, friendship.receiver_id))
+        friendship.save(update_fields=['user_low', 'user_high'])
+
+
+def remove_mirrored_requests(apps, schema_editor):
+    """
+    Until unique_friendship_pair, A->B and B->A could both be stored. For each
+    such pair keep one row (an accepted friendship if there is one, otherwise
+    the newest request) and delete the other.
+    """
+    Friendship = apps.get_model('accounts', 'Friendship')
+    pairs = (
+        Friendship.objects.values('user_low', 'user_high')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for pair in pairs:
+        rows = Friendship.objects.filter(
+            user_low=pair['user_low'], user_high=pair['user_high']
+        ).order_by(
+            Case(When(status='accepted', then=Value(0)), default=Value(1), output_field=IntegerField()),
+            '-created_at',
+        )
+        keep = rows.values_list('id', flat=True)[0]
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_friendtransaction_pair_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='friendship',
+            name='user_low',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='friendship',
+            name='user_high',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_user_pair, migrations.RunPython.noop),
+        migrations.RunPython(remove_mirrored_requests, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='friendship',
+            name='user_low',
+            field=models.BigIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='friendship',
+            name='user_high',
+            field=models.BigIntegerField(editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high'), name='unique_friendship_pair'),
+        ),
+    ]
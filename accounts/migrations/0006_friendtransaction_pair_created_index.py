@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_friendship_user_pair'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendtransaction',
+            index=models.Index(fields=['initiator', 'friend', '-created_at'], name='ft_pair_created_idx'),
+        ),
+    ]
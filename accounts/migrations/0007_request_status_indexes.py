@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_friendtransaction_pair_created_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historyresetrequest',
+            index=models.Index(fields=['target_user', 'status'], name='hrr_target_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactiondeleterequest',
+            index=models.Index(fields=['transaction', 'status'], name='tdr_transaction_status_idx'),
+        ),
+    ]
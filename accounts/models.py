@@ -125,20 +125,43 @@ class Friendship(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True) # Automatically set when created
     updated_at = models.DateTimeField(auto_now=True)     # Automatically set when saved
+    # The two user ids in sorted order, set in save(), so "is there a friendship
+    # between A and B" is a single index seek instead of an OR of both directions
+    user_low = models.BigIntegerField(editable=False)
+    user_high = models.BigIntegerField(editable=False)
 
     class Meta:
         # Ensures a user cannot send multiple requests to the same person
         constraints = [
             UniqueConstraint(fields=['requester', 'receiver'], name='unique_friend_request'),
+            # ...in either direction: one row per pair of users, found with a single index probe
+            UniqueConstraint(fields=['user_low', 'user_high'], name='unique_friendship_pair'),
             # Prevent sending a request to oneself
             models.CheckConstraint(check=~Q(requester=models.F('receiver')), name='prevent_self_request')
         ]
+        # Pending/accepted lookups always filter on one side of the request plus status
+        indexes = [
+            models.Index(fields=['receiver', 'status'], name='fs_receiver_status_idx'),
+            models.Index(fields=['requester', 'status'], name='fs_requester_status_idx'),
+        ]
         ordering = ['-created_at'] # Show newest requests first by default
 
     def __str__(self):
         # Provides a readable representation in the admin or shell
         return f"{self.requester.username} -> {self.receiver.username} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        self.user_low, self.user_high = sorted((self.requester_id, self.receiver_id))
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def between(user_a_id, user_b_id):
+        """
+        Q matching the friendship row between two users, whichever of them sent it.
+        """
+        user_low, user_high = sorted((user_a_id, user_b_id))
+        return Q(user_low=user_low, user_high=user_high)
+
 # --- Leave space here for FriendTransaction model later ---
 
 
@@ -191,6 +214,15 @@ class FriendTransaction(models.Model):
         constraints = [
              models.CheckConstraint(check=~Q(initiator=models.F('friend')), name='prevent_self_transaction')
         ]
+        indexes = [
+            models.Index(fields=['friend', 'status'], name='ft_friend_status_idx'),
+            models.Index(fields=['initiator', 'status'], name='ft_initiator_status_idx'),
+            # Transaction history between a pair of users (queried in both directions)
+            models.Index(fields=['initiator', 'friend', 'status'], name='ft_pair_status_idx'),
+            # Paged transaction history for a pair, newest first
+            models.Index(fields=['initiator', 'friend', '-created_at'], name='ft_pair_created_idx'),
+            models.Index(fields=['created_at'], name='ft_created_at_idx'),
+        ]
 
     def __str__(self):
         # Readable representation
@@ -229,6 +261,10 @@ class TransactionDeleteRequest(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['transaction', 'requester']  # Prevent duplicate requests
+        # Checked before creating a request: is one already pending for this transaction?
+        indexes = [
+            models.Index(fields=['transaction', 'status'], name='tdr_transaction_status_idx'),
+        ]
 
     def __str__(self):
         return f"Delete request for Transaction #{self.transaction.id} by {self.requester.username}"
@@ -264,6 +300,10 @@ class HistoryResetRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Pending requests are looked up by the receiving user
+        indexes = [
+            models.Index(fields=['target_user', 'status'], name='hrr_target_status_idx'),
+        ]
 
     def __str__(self):
         return f"Reset request from {self.requester.username} to {self.target_user.username}"
\ No newline at end of file
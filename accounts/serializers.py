@@ -1,21 +1,63 @@
 # accounts/serializers.py
 
+import copy
+
 from rest_framework import serializers
-from .models import CustomUser, Friendship, FriendTransaction
-from django.contrib.auth import get_user_model, authenticate
+from rest_framework.exceptions import NotFound
+from rest_framework.throttling import BaseThrottle
+from django.contrib.auth import get_user_model, authenticate, password_validation
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Greatest, Least
 from django.utils.translation import gettext_lazy as _
-from .models import CustomUser, Friendship, FriendTransaction, TransactionDeleteRequest, HistoryResetRequest
+from .models import Friendship, FriendTransaction, TransactionDeleteRequest, HistoryResetRequest
 User = get_user_model()
 
+# Failed logins allowed per (username, client address) before authenticate()
+# (and its password hash) is skipped until the window expires.
+LOGIN_FAILURE_LIMIT = 5
+LOGIN_FAILURE_TIMEOUT = 15 * 60  # seconds
+
+# Client address as DRF's throttles see it (honours NUM_PROXIES)
+_client_ident = BaseThrottle().get_ident
+
+# --- Per-class field cache ---
+class CachedFieldsMixin:
+    """
+    Build a serializer's fields once per class and give each instance
+    shallow copies, instead of re-running ModelSerializer introspection and
+    the deepcopy of declared fields for every instance (nested ones included).
+    Only for serializers whose fields don't depend on the instance or context.
+    """
+    def get_fields(self):
+        cls = type(self)
+        cached = cls.__dict__.get('_fields_cache')
+        if cached is None:
+            cached = cls._fields_cache = super().get_fields()
+        # bind() sets parent/field_name on each field, so every instance
+        # needs its own copy
+        return {name: copy.copy(field) for name, field in cached.items()}
+
+# --- Fixed-point amount field ---
+class FixedDecimalField(serializers.DecimalField):
+    """
+    DecimalField that renders the stored value as-is.
+    Model DecimalFields already come back from the database at their
+    decimal_places, so the per-row quantize() in DRF's DecimalField is skipped.
+    """
+    def to_representation(self, value):
+        return format(value, 'f')
+
 # --- User Serializer ---
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the CustomUser model.
     Includes basic user information. Password is write-only.
     """
     class Meta:
         model = User
-        fields = ['id', 'username', 'first_name', 'last_name', 'password']
+        fields = ('id', 'username', 'first_name', 'last_name', 'password')
         extra_kwargs = {
             'password': {'write_only': True, 'style': {'input_type': 'password'}}
         }
@@ -39,15 +81,43 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 # --- Simple User Serializer (for nested representations) ---
-class SimpleUserSerializer(serializers.ModelSerializer):
+# Columns rendered by SimpleUserSerializer; querysets feeding it can load just these.
+SIMPLE_USER_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+class SimpleUserSerializer(CachedFieldsMixin, serializers.Serializer):
     """
     Simple serializer showing basic user info.
     Used for nested representations (e.g., in friendship, transactions).
+    Fields are declared explicitly (all read-only) so DRF doesn't have to
+    introspect the user model every time one of these is built.
     """
-    class Meta:
-        model = User
-        fields = ['id', 'username', 'first_name', 'last_name']
-        read_only_fields = fields
+    id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(read_only=True)
+    first_name = serializers.CharField(read_only=True)
+    last_name = serializers.CharField(read_only=True)
+
+    def to_representation(self, instance):
+        # The same few users repeat across rows of a list response, so render
+        # each one once per list and reuse the result. Single-object roots may
+        # be shared between requests and must not keep anything in context.
+        if not isinstance(self.root, serializers.ListSerializer):
+            return super().to_representation(instance)
+        user_cache = self.context.setdefault('_user_cache', {})
+        if instance.pk not in user_cache:
+            user_cache[instance.pk] = super().to_representation(instance)
+        return user_cache[instance.pk]
+
+def get_user_by_username(username, not_found_message, queryset=None):
+    """
+    Resolve a username to a user, loading only the columns that
+    SimpleUserSerializer renders. Raises NotFound (404) if there is no match.
+    """
+    if queryset is None:
+        queryset = User.objects.all()
+    try:
+        return queryset.only(*SIMPLE_USER_FIELDS).get(username=username)
+    except User.DoesNotExist:
+        raise NotFound(not_found_message)
 
 # --- Change Password Serializer ---
 class ChangePasswordSerializer(serializers.Serializer):
@@ -57,17 +127,24 @@ class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True, write_only=True)
     new_password = serializers.CharField(required=True, write_only=True)
 
-    def validate_old_password(self, value):
-        user = self.context['request'].user
-        if not user.check_password(value):
-            raise serializers.ValidationError(_("Old password is incorrect."))
-        return value
-
     def validate_new_password(self, value):
-        if len(value) < 6:
-            raise serializers.ValidationError(_("New password must be at least 6 characters long."))
+        # Runs AUTH_PASSWORD_VALIDATORS in order; the common-password list is
+        # loaded once per process and cached by Django.
+        try:
+            password_validation.validate_password(value, user=self.context['request'].user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(list(e.messages))
         return value
 
+    def validate(self, attrs):
+        # The old password is verified last: check_password() runs the slow
+        # password hash, so a submission whose new password is rejected
+        # anyway never pays for it.
+        user = self.context['request'].user
+        if not user.check_password(attrs['old_password']):
+            raise serializers.ValidationError({'old_password': [_("Old password is incorrect.")]})
+        return attrs
+
     def save(self, **kwargs):
         user = self.context['request'].user
         user.set_password(self.validated_data['new_password'])
@@ -75,7 +152,7 @@ class ChangePasswordSerializer(serializers.Serializer):
         return user
 
 # --- Friendship Serializer ---
-class FriendshipSerializer(serializers.ModelSerializer):
+class FriendshipSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Friendship model.
     Includes nested user information for sender and receiver.
@@ -86,7 +163,7 @@ class FriendshipSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Friendship
-        fields = [
+        fields = (
             'id',
             'sender',
             'receiver',
@@ -94,42 +171,61 @@ class FriendshipSerializer(serializers.ModelSerializer):
             'status',
             'created_at',
             'updated_at',
-        ]
-        read_only_fields = ['id', 'sender', 'receiver', 'created_at', 'updated_at', 'status']
+        )
+        read_only_fields = ('id', 'sender', 'receiver', 'created_at', 'updated_at', 'status')
+
+    def validate(self, attrs):
+        # Resolve the receiver once here so the view doesn't query for it again
+        receiver_username = attrs.get('receiver_username')
+        if receiver_username:
+            attrs['receiver'] = get_user_by_username(
+                receiver_username, "User with that username does not exist."
+            )
+        return attrs
     
     def create(self, validated_data):
         # Remove receiver_username since it's not a model field
         validated_data.pop('receiver_username', None)
         return super().create(validated_data)
 
-# --- Friendship Status Update Serializer ---
-class FriendshipStatusUpdateSerializer(serializers.Serializer):
+# --- Base for accept/reject style action serializers ---
+class StatusActionSerializer(serializers.Serializer):
     """
-    Simple serializer to accept/reject a friend request.
+    Maps the submitted `action` to the status it sets.
+    Subclasses declare the `action` ChoiceField and an `action_map`
+    of {action: status}.
     """
-    action = serializers.ChoiceField(choices=['accept', 'reject'], required=True)
+    action_map = {}
 
     def validate(self, attrs):
-        action = attrs.get('action')
-        if action == 'accept':
-            attrs['status'] = Friendship.StatusChoices.ACCEPTED
-        elif action == 'reject':
-            attrs['status'] = Friendship.StatusChoices.REJECTED
+        attrs['status'] = self.action_map[attrs['action']]
         return attrs
 
+# --- Friendship Status Update Serializer ---
+class FriendshipStatusUpdateSerializer(StatusActionSerializer):
+    """
+    Simple serializer to accept/reject a friend request.
+    """
+    action = serializers.ChoiceField(choices=['accept', 'reject'], required=True)
+    action_map = {
+        'accept': Friendship.StatusChoices.ACCEPTED,
+        'reject': Friendship.StatusChoices.REJECTED,
+    }
+
 # --- Friend Transaction Serializer ---
-class FriendTransactionSerializer(serializers.ModelSerializer):
+class FriendTransactionSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for FriendTransaction model.
     """
     initiator = SimpleUserSerializer(read_only=True)
     friend = SimpleUserSerializer(read_only=True)
     friend_username = serializers.CharField(write_only=True, required=False)
+    amount = FixedDecimalField(max_digits=10, decimal_places=2)
     action_taken_by = SimpleUserSerializer(read_only=True)  
     
     class Meta:
         model = FriendTransaction
-        fields = [
+        fields = (
             'id',
             'initiator',
             'friend',
@@ -139,9 +235,27 @@ class FriendTransactionSerializer(serializers.ModelSerializer):
             'status',
             'created_at',
             'updated_at',
-            'action_taken_by', 
-        ]
-        read_only_fields = ['id', 'initiator', 'friend', 'status', 'created_at', 'updated_at', 'action_taken_by']
+            'action_taken_by',
+        )
+        read_only_fields = ('id', 'initiator', 'friend', 'status', 'created_at', 'updated_at', 'action_taken_by')
+
+    def validate(self, attrs):
+        # Resolve the friend once here so the view doesn't query for it again,
+        # flagging in the same SELECT whether the two users are friends
+        friend_username = attrs.get('friend_username')
+        if friend_username:
+            initiator = self.context['request'].user
+            accepted_friendship = Friendship.objects.filter(
+                user_low=Least(Value(initiator.pk), OuterRef('pk')),
+                user_high=Greatest(Value(initiator.pk), OuterRef('pk')),
+                status=Friendship.StatusChoices.ACCEPTED
+            )
+            attrs['friend'] = get_user_by_username(
+                friend_username,
+                "User (friend) with that username does not exist.",
+                User.objects.annotate(is_friend=Exists(accepted_friendship)),
+            )
+        return attrs
     
     def create(self, validated_data):
         # Remove friend_username since it's not a model field
@@ -149,19 +263,15 @@ class FriendTransactionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
     
 # --- Transaction Status Update Serializer ---
-class TransactionStatusUpdateSerializer(serializers.Serializer):
+class TransactionStatusUpdateSerializer(StatusActionSerializer):
     """
     Simple serializer to accept/reject a transaction.
     """
     action = serializers.ChoiceField(choices=['accept', 'reject'], required=True)
-
-    def validate(self, attrs):
-        action = attrs.get('action')
-        if action == 'accept':
-            attrs['status'] = FriendTransaction.StatusChoices.ACCEPTED
-        elif action == 'reject':
-            attrs['status'] = FriendTransaction.StatusChoices.REJECTED
-        return attrs
+    action_map = {
+        'accept': FriendTransaction.StatusChoices.ACCEPTED,
+        'reject': FriendTransaction.StatusChoices.REJECTED,
+    }
 
 # --- Login Serializer ---
 class LoginSerializer(serializers.Serializer):
@@ -176,20 +286,35 @@ class LoginSerializer(serializers.Serializer):
         password = attrs.get('password')
 
         if username and password:
+            request = self.context.get('request')
+            # Counted per client as well as per username, so failures from one
+            # address can't lock the account out for everyone else
+            client = _client_ident(request) if request is not None else ''
+            failure_key = f'login_fail:{username}:{client}'
+            if cache.get(failure_key, 0) >= LOGIN_FAILURE_LIMIT:
+                raise serializers.ValidationError(_('Too many failed login attempts. Please try again later.'))
+
             user = authenticate(
-                request=self.context.get('request'),
+                request=request,
                 username=username,
                 password=password
             )
             if not user:
+                if not cache.add(failure_key, 1, LOGIN_FAILURE_TIMEOUT):
+                    try:
+                        cache.incr(failure_key)
+                    except ValueError:
+                        # Expired between add() and incr(); start a new window
+                        cache.set(failure_key, 1, LOGIN_FAILURE_TIMEOUT)
                 raise serializers.ValidationError(_('Unable to log in with provided credentials.'))
+            cache.delete(failure_key)
         else:
             raise serializers.ValidationError(_('Must include "username" and "password".'))
 
         attrs['user'] = user
         return attrs
 
-class TransactionDeleteRequestSerializer(serializers.ModelSerializer):
+class TransactionDeleteRequestSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for transaction delete requests.
     """
@@ -198,11 +323,11 @@ class TransactionDeleteRequestSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = TransactionDeleteRequest
-        fields = ['id', 'transaction', 'requester', 'status', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'requester', 'status', 'created_at', 'updated_at']
+        fields = ('id', 'transaction', 'requester', 'status', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'requester', 'status', 'created_at', 'updated_at')
 
 
-class HistoryResetRequestSerializer(serializers.ModelSerializer):
+class HistoryResetRequestSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for history reset requests.
     """
@@ -211,35 +336,27 @@ class HistoryResetRequestSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = HistoryResetRequest
-        fields = ['id', 'requester', 'target_user', 'status', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'requester', 'target_user', 'status', 'created_at', 'updated_at']
+        fields = ('id', 'requester', 'target_user', 'status', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'requester', 'target_user', 'status', 'created_at', 'updated_at')
 
 
-class DeleteRequestActionSerializer(serializers.Serializer):
+class DeleteRequestActionSerializer(StatusActionSerializer):
     """
     Simple serializer to approve/reject delete requests.
     """
     action = serializers.ChoiceField(choices=['approve', 'reject'], required=True)
-
-    def validate(self, attrs):
-        action = attrs.get('action')
-        if action == 'approve':
-            attrs['status'] = TransactionDeleteRequest.StatusChoices.APPROVED
-        elif action == 'reject':
-            attrs['status'] = TransactionDeleteRequest.StatusChoices.REJECTED
-        return attrs
+    action_map = {
+        'approve': TransactionDeleteRequest.StatusChoices.APPROVED,
+        'reject': TransactionDeleteRequest.StatusChoices.REJECTED,
+    }
 
 
-class ResetRequestActionSerializer(serializers.Serializer):
+class ResetRequestActionSerializer(StatusActionSerializer):
     """
     Simple serializer to approve/reject reset requests.
     """
     action = serializers.ChoiceField(choices=['approve', 'reject'], required=True)
-
-    def validate(self, attrs):
-        action = attrs.get('action')
-        if action == 'approve':
-            attrs['status'] = HistoryResetRequest.StatusChoices.APPROVED
-        elif action == 'reject':
-            attrs['status'] = HistoryResetRequest.StatusChoices.REJECTED
-        return attrs
+    action_map = {
+        'approve': HistoryResetRequest.StatusChoices.APPROVED,
+        'reject': HistoryResetRequest.StatusChoices.REJECTED,
+    }
@@ -1,3 +1,180 @@
-from django.test import TestCase
+from datetime import datetime, timezone
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import Friendship, FriendTransaction, HistoryResetRequest, TransactionDeleteRequest
+from .serializers import LOGIN_FAILURE_LIMIT
+
+User = get_user_model()
+
+# Each test gets an empty cache of its own rather than the shared one
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FriendshipUserPairMigrationTests(TransactionTestCase):
+    """
+    0005_friendship_user_pair keeps one row per pair of users before adding
+    unique_friendship_pair.
+    """
+    migrate_from = [('accounts', '0004_friendtransaction_pair_index')]
+    migrate_to = [('accounts', '0005_friendship_user_pair')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        User = apps.get_model('accounts', 'CustomUser')
+        Friendship = apps.get_model('accounts', 'Friendship')
+
+        self.alice, self.bob, self.carol, self.dave = (
+            User.objects.create(username=name) for name in ('alice', 'bob', 'carol', 'dave')
+        )
+
+        def friendship(requester, receiver, status, day):
+            row = Friendship.objects.create(requester=requester, receiver=receiver, status=status)
+            # created_at is auto_now_add, so set the ordering the test needs afterwards
+            Friendship.objects.filter(pk=row.pk).update(created_at=datetime(2024, 1, day, tzinfo=timezone.utc))
+            return row.pk
+
+        # Accepted beats a newer pending request in the other direction
+        self.accepted = friendship(self.alice, self.bob, 'accepted', 1)
+        self.newer_pending = friendship(self.bob, self.alice, 'pending', 2)
+        # Otherwise the newest request wins
+        self.older_pending = friendship(self.alice, self.carol, 'pending', 1)
+        self.newer_rejected = friendship(self.carol, self.alice, 'rejected', 2)
+        # A pair stored once is left alone
+        self.single = friendship(self.dave, self.alice, 'pending', 1)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_keeps_accepted_then_newest_row_per_pair(self):
+        Friendship = self.apps.get_model('accounts', 'Friendship')
+        self.assertEqual(
+            set(Friendship.objects.values_list('pk', flat=True)),
+            {self.accepted, self.newer_rejected, self.single},
+        )
+
+    def test_backfills_sorted_user_pair(self):
+        Friendship = self.apps.get_model('accounts', 'Friendship')
+        friendship = Friendship.objects.get(pk=self.single)
+        self.assertEqual(
+            (friendship.user_low, friendship.user_high),
+            tuple(sorted((self.dave.pk, self.alice.pk))),
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LoginLockoutTests(TestCase):
+    password = 'correct horse battery staple'
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='alice', password=self.password)
+        self.client = APIClient(REMOTE_ADDR='10.0.0.1')
+
+    def login(self, password, client=None):
+        return (client or self.client).post(
+            '/api/accounts/login/', {'username': 'alice', 'password': password}, format='json'
+        )
+
+    def fail(self, times):
+        for _ in range(times):
+            self.assertEqual(self.login('wrong').status_code, 400)
+
+    def test_locks_out_after_limit(self):
+        self.fail(LOGIN_FAILURE_LIMIT - 1)
+        self.assertEqual(self.login(self.password).status_code, 200)
+
+        self.fail(LOGIN_FAILURE_LIMIT)
+        response = self.login(self.password)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Too many failed login attempts', str(response.data))
+
+    def test_success_resets_the_count(self):
+        self.fail(LOGIN_FAILURE_LIMIT - 1)
+        self.assertEqual(self.login(self.password).status_code, 200)
+        self.fail(LOGIN_FAILURE_LIMIT - 1)
+        self.assertEqual(self.login(self.password).status_code, 200)
+
+    def test_lockout_is_per_client_address(self):
+        self.fail(LOGIN_FAILURE_LIMIT)
+        other_client = APIClient(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(self.login(self.password, other_client).status_code, 200)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ActionTwiceTests(TestCase):
+    """
+    Actions are a conditional UPDATE on pending rows, so the second of two
+    actions on the same request finds nothing to update and returns 404.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='x')
+        self.bob = User.objects.create_user(username='bob', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def act(self, url, action):
+        return self.client.patch(url, {'action': action}, format='json')
+
+    def test_second_friend_request_action_is_404(self):
+        request = Friendship.objects.create(requester=self.alice, receiver=self.bob)
+        url = f'/api/accounts/friends/request/{request.pk}/action/'
+
+        self.assertEqual(self.act(url, 'accept').status_code, 200)
+        self.assertEqual(self.act(url, 'reject').status_code, 404)
+        request.refresh_from_db()
+        self.assertEqual(request.status, Friendship.StatusChoices.ACCEPTED)
+
+    def test_second_transaction_action_is_404(self):
+        transaction = FriendTransaction.objects.create(initiator=self.alice, friend=self.bob, amount=10)
+        url = f'/api/accounts/transactions/{transaction.pk}/action/'
+
+        self.assertEqual(self.act(url, 'accept').status_code, 200)
+        self.assertEqual(self.act(url, 'reject').status_code, 404)
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.status, FriendTransaction.StatusChoices.ACCEPTED)
+        self.assertEqual(transaction.action_taken_by, self.bob)
+
+    def accepted_transaction(self):
+        return FriendTransaction.objects.create(
+            initiator=self.alice, friend=self.bob, amount=10,
+            status=FriendTransaction.StatusChoices.ACCEPTED,
+        )
+
+    def test_second_delete_approval_is_404(self):
+        transaction = self.accepted_transaction()
+        kept = self.accepted_transaction()
+        request = TransactionDeleteRequest.objects.create(transaction=transaction, requester=self.alice)
+        url = f'/api/accounts/transactions/delete/{request.pk}/action/'
+
+        self.assertEqual(self.act(url, 'approve').status_code, 200)
+        self.assertEqual(self.act(url, 'approve').status_code, 404)
+        self.assertEqual(list(FriendTransaction.objects.values_list('pk', flat=True)), [kept.pk])
+
+    def test_second_reset_approval_is_404(self):
+        self.accepted_transaction()
+        request = HistoryResetRequest.objects.create(requester=self.alice, target_user=self.bob)
+        url = f'/api/accounts/history/reset/{request.pk}/action/'
+
+        self.assertEqual(self.act(url, 'approve').status_code, 200)
+        self.assertFalse(FriendTransaction.objects.exists())
+
+        # History recorded after the reset survives a repeated approval
+        kept = self.accepted_transaction()
+        self.assertEqual(self.act(url, 'approve').status_code, 404)
+        self.assertEqual(list(FriendTransaction.objects.values_list('pk', flat=True)), [kept.pk])
@@ -1,10 +1,18 @@
 # accounts/views.py
+import json
+
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Case, Q, When
+from django.db.transaction import atomic
+from django.http import HttpResponse
+from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError, NotFound
-from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.authtoken.models import Token
 
 from .serializers import (
@@ -16,6 +24,8 @@ from .serializers import (
     FriendTransactionSerializer,
     TransactionStatusUpdateSerializer,
     SimpleUserSerializer,
+    SIMPLE_USER_FIELDS,
+    get_user_by_username,
     TransactionDeleteRequestSerializer,      # ← ADD THIS
     HistoryResetRequestSerializer,           # ← ADD THIS
     DeleteRequestActionSerializer,           # ← ADD THIS
@@ -28,8 +38,66 @@ from .models import (
     TransactionDeleteRequest,  # ← ADD THIS
     HistoryResetRequest,        # ← ADD THIS
 )
+from .friends import FRIEND_LIST_CACHE_TIMEOUT, friend_list_cache_key, forget_friend_lists
 
 User = get_user_model()
+
+# Shared, context-free serializers for rendering the single row returned by the
+# login and accept/reject views, so building and binding their fields happens
+# once per process rather than once per response.
+_user_out = UserSerializer()
+_friendship_out = FriendshipSerializer()
+_transaction_out = FriendTransactionSerializer()
+
+
+def _detail_json(message):
+    """Encode a constant {"detail": ...} body once, the way JSONRenderer would."""
+    return json.dumps({"detail": message}, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+_PASSWORD_UPDATED = _detail_json("Password updated successfully")
+_DELETE_APPROVED = _detail_json("Delete request approved. Transaction deleted.")
+_DELETE_REJECTED = _detail_json("Delete request rejected.")
+_RESET_REJECTED = _detail_json("History reset request rejected.")
+
+
+def detail_response(content):
+    """200 response for a pre-encoded constant body, skipping the renderer."""
+    return HttpResponse(content, content_type='application/json')
+
+
+def update_pending_or_404(queryset, pk, not_found, **changes):
+    """
+    Apply changes to row pk of a queryset of actionable (pending) requests,
+    or raise NotFound. One conditional UPDATE: no SELECT first, and of two
+    concurrent actions on the same request only one can succeed.
+    """
+    if not queryset.filter(pk=pk).update(updated_at=timezone.now(), **changes):
+        raise NotFound(not_found)
+
+
+def with_simple_users(queryset, *relations):
+    """
+    select_related() the given user FKs in one JOIN, keeping every column of
+    the base model but only the SimpleUserSerializer columns of each user.
+    Relations may go through other models ('transaction__initiator'); those
+    intermediate models are loaded in full.
+    """
+    fields = [field.name for field in queryset.model._meta.concrete_fields]
+    models_by_path = {'': queryset.model}
+    for relation in relations:
+        *path, user_field = relation.split('__')
+        prefix = ''
+        for name in path:
+            model = models_by_path[prefix]
+            prefix = f'{prefix}{name}__'
+            if prefix not in models_by_path:
+                models_by_path[prefix] = model._meta.get_field(name).related_model
+                fields += [f'{prefix}{field.name}' for field in models_by_path[prefix]._meta.concrete_fields]
+        fields += [f'{relation}__{name}' for name in SIMPLE_USER_FIELDS]
+    return queryset.select_related(*relations).only(*fields)
+
+
 class UserRegisterView(generics.CreateAPIView):
     """
     API view for user registration.
@@ -38,6 +106,9 @@ class UserRegisterView(generics.CreateAPIView):
     """
     queryset = User.objects.all()
     permission_classes = [permissions.AllowAny]
+    # Each request runs the password hasher; rate set by the 'auth' scope
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'auth'
     serializer_class = UserSerializer
 
     def create(self, request, *args, **kwargs):
@@ -49,12 +120,12 @@ class UserRegisterView(generics.CreateAPIView):
         # Get the created user
         user = serializer.instance
         
-        # Create or get auth token for the user
-        token, created = Token.objects.get_or_create(user=user)
+        # A brand-new user has no token yet, so create it directly
+        token = Token.objects.create(user=user)
         
-        # Return user info with token
+        # Return user info with token (the bound serializer already renders it)
         return Response({
-            'user': UserSerializer(user, context=self.get_serializer_context()).data,
+            'user': serializer.data,
             'token': token.key
         }, status=status.HTTP_201_CREATED)
     
@@ -64,6 +135,9 @@ class ChangePasswordView(generics.UpdateAPIView):
     """
     serializer_class = ChangePasswordSerializer
     permission_classes = [permissions.IsAuthenticated] # Must be logged in
+    # Each request runs the password hasher; rate set by the 'auth' scope
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'auth'
 
     def get_object(self, queryset=None):
         # Return the currently authenticated user
@@ -73,12 +147,10 @@ class ChangePasswordView(generics.UpdateAPIView):
         self.object = self.get_object()
         serializer = self.get_serializer(data=request.data)
 
-        if serializer.is_valid(raise_exception=True):
-            # save() method in the serializer handles the password update
-            serializer.save()
-            return Response({"detail": "Password updated successfully"}, status=status.HTTP_200_OK)
-
-        # Note: is_valid(raise_exception=True) handles returning 400 Bad Request on errors
+        serializer.is_valid(raise_exception=True)
+        # save() method in the serializer handles the password update
+        serializer.save()
+        return detail_response(_PASSWORD_UPDATED)
 
 # --- Friendship Views ---
 
@@ -94,40 +166,48 @@ class FriendRequestSendView(generics.CreateAPIView):
         if not receiver_username:
             raise ValidationError("Receiver username must be provided.")
 
-        try:
-            receiver = User.objects.get(username=receiver_username)
-        except User.DoesNotExist:
-            raise NotFound("User with that username does not exist.")
+        # Resolved (or rejected with 404) by FriendshipSerializer.validate
+        receiver = serializer.validated_data['receiver']
 
         requester = self.request.user
 
         if requester == receiver:
             raise ValidationError("You cannot send a friend request to yourself.")
 
-        # Check if a request already exists (in either direction)
+        self.reject_existing_request(requester, receiver, receiver_username)
+
+        # If no blocking request exists, create the new pending request.
+        # unique_friendship_pair still rejects one created by a concurrent
+        # request in the meantime; report it the same way.
+        try:
+            serializer.save(requester=requester, receiver=receiver, status=Friendship.StatusChoices.PENDING)
+        except IntegrityError:
+            self.reject_existing_request(requester, receiver, receiver_username)
+            raise
+
+    def reject_existing_request(self, requester, receiver, receiver_username):
+        # Check if a request already exists (in either direction).
+        # Only the two columns we branch on are fetched; no model instance is built.
         existing_request = Friendship.objects.filter(
-            (Q(requester=requester, receiver=receiver) | Q(requester=receiver, receiver=requester))
-        ).first()
+            Friendship.between(requester.id, receiver.id)
+        ).values('status', 'requester_id').first()
 
         if existing_request:
-            if existing_request.status == Friendship.StatusChoices.ACCEPTED:
+            if existing_request['status'] == Friendship.StatusChoices.ACCEPTED:
                  raise ValidationError("You are already friends with this user.")
-            elif existing_request.status == Friendship.StatusChoices.PENDING:
+            elif existing_request['status'] == Friendship.StatusChoices.PENDING:
                  # If request exists B->A and A tries A->B, maybe auto-accept? Or just raise error.
                  # For simplicity, we raise error here.
-                 if existing_request.requester == receiver: # They already sent you a request
+                 if existing_request['requester_id'] == receiver.id: # They already sent you a request
                     raise ValidationError(f"User '{receiver_username}' has already sent you a friend request. Accept or reject it.")
                  else: # You already sent them a request
                     raise ValidationError(f"You have already sent a friend request to '{receiver_username}'.")
-            elif existing_request.status == Friendship.StatusChoices.REJECTED:
+            elif existing_request['status'] == Friendship.StatusChoices.REJECTED:
                 # Optional: Allow resending a request after rejection? If so, delete existing and create new.
                 # For now, prevent resending.
                 raise ValidationError(f"Your previous friend request with '{receiver_username}' was rejected.")
             # Add handling for other potential statuses if needed
 
-        # If no blocking request exists, create the new pending request
-        serializer.save(requester=requester, receiver=receiver, status=Friendship.StatusChoices.PENDING)
-
 class PendingFriendRequestsView(generics.ListAPIView):
     """
     API view to list pending friend requests received by the authenticated user.
@@ -137,9 +217,12 @@ class PendingFriendRequestsView(generics.ListAPIView):
 
     def get_queryset(self):
         # Return requests where the current user is the receiver and status is pending
-        return Friendship.objects.filter(
-            receiver=self.request.user,
-            status=Friendship.StatusChoices.PENDING
+        return with_simple_users(
+            Friendship.objects.filter(
+                receiver=self.request.user,
+                status=Friendship.StatusChoices.PENDING
+            ),
+            'requester', 'receiver'
         )
 
 class FriendRequestActionView(generics.UpdateAPIView):
@@ -147,31 +230,38 @@ class FriendRequestActionView(generics.UpdateAPIView):
     API view to accept or reject a pending friend request.
     The URL for this view should include the friendship request ID (pk).
     """
-    queryset = Friendship.objects.all()
+    queryset = Friendship.objects.select_related('requester', 'receiver')
     serializer_class = FriendshipStatusUpdateSerializer # Use the simple status update serializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Ensure the user can only act on requests sent *to* them that are pending
-        return Friendship.objects.filter(
-            receiver=self.request.user,
-            status=Friendship.StatusChoices.PENDING
+        return with_simple_users(
+            Friendship.objects.filter(
+                receiver=self.request.user,
+                status=Friendship.StatusChoices.PENDING
+            ),
+            'requester', 'receiver'
         )
 
     def update(self, request, *args, **kwargs):
-        friendship = self.get_object() # Gets the specific request based on pk in URL
         serializer = self.get_serializer(data=request.data)
 
-        if serializer.is_valid(raise_exception=True):
-            new_status = serializer.validated_data['status']
-            if friendship.status == Friendship.StatusChoices.PENDING:
-                friendship.status = new_status
-                friendship.save()
-                # Return the updated friendship details
-                return Response(FriendshipSerializer(friendship).data, status=status.HTTP_200_OK)
-            else:
-                # Should not happen due to get_queryset, but good practice to check
-                return Response({"detail": "This request is not pending."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        update_pending_or_404(
+            self.get_queryset(), kwargs['pk'],
+            "No pending friend request found with that ID.",
+            status=new_status
+        )
+
+        # Return the updated friendship details
+        friendship = with_simple_users(
+            Friendship.objects.filter(pk=kwargs['pk']), 'requester', 'receiver'
+        ).get()
+        # update() sends no post_save, so drop the cached friend lists here
+        forget_friend_lists(friendship.requester_id, friendship.receiver_id)
+        return Response(_friendship_out.to_representation(friendship), status=status.HTTP_200_OK)
 
 class FriendListView(generics.ListAPIView):
     """
@@ -182,21 +272,27 @@ class FriendListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        # Find friendships where the status is accepted and the user is either requester or receiver
-        accepted_friendships = Friendship.objects.filter(
+        # Accepted friendships where the user is either requester or receiver,
+        # reduced to the id of the other side. This stays a subquery, so no
+        # Friendship rows are loaded into Python.
+        friend_ids = Friendship.objects.filter(
             (Q(requester=user) | Q(receiver=user)),
             status=Friendship.StatusChoices.ACCEPTED
-        )
-        # Get the IDs of the friends (the user who is NOT the current user)
-        friend_ids = set()
-        for friendship in accepted_friendships:
-            if friendship.requester == user:
-                friend_ids.add(friendship.receiver.id)
-            else:
-                friend_ids.add(friendship.requester.id)
+        ).annotate(
+            friend_id=Case(When(requester=user, then='receiver_id'), default='requester_id')
+        ).values('friend_id')
+
+        return User.objects.filter(id__in=friend_ids).only(*SIMPLE_USER_FIELDS).order_by('username')
 
-        # Return the User objects corresponding to the friend IDs
-        return User.objects.filter(id__in=friend_ids).order_by('username')
+    def list(self, request, *args, **kwargs):
+        # Polled often and changes rarely: serve the rendered list from the
+        # cache until one of the user's friendships changes
+        cache_key = friend_list_cache_key(request.user.pk)
+        data = cache.get(cache_key)
+        if data is None:
+            data = list(super().list(request, *args, **kwargs).data)
+            cache.set(cache_key, data, FRIEND_LIST_CACHE_TIMEOUT)
+        return Response(data)
 
 
 # --- Friend Transaction Views ---
@@ -220,23 +316,17 @@ class CreateTransactionView(generics.CreateAPIView):
         if amount == 0:
              raise ValidationError("Amount cannot be zero.")
 
-        try:
-            friend = User.objects.get(username=friend_username)
-        except User.DoesNotExist:
-            raise NotFound("User (friend) with that username does not exist.")
+        # Resolved (or rejected with 404) by FriendTransactionSerializer.validate
+        friend = serializer.validated_data['friend']
 
         initiator = self.request.user
 
         if initiator == friend:
             raise ValidationError("You cannot create a transaction with yourself.")
 
-        # Check if they are actually friends (status='accepted')
-        are_friends = Friendship.objects.filter(
-            (Q(requester=initiator, receiver=friend, status=Friendship.StatusChoices.ACCEPTED) |
-             Q(requester=friend, receiver=initiator, status=Friendship.StatusChoices.ACCEPTED))
-        ).exists()
-
-        if not are_friends:
+        # Check if they are actually friends (status='accepted'); is_friend is
+        # annotated onto the friend lookup in FriendTransactionSerializer.validate
+        if not friend.is_friend:
             raise ValidationError(f"You are not friends with '{friend_username}'.")
 
         # Save the transaction with pending status
@@ -259,9 +349,12 @@ class PendingTransactionsView(generics.ListAPIView):
     def get_queryset(self):
         # Return transactions where the current user is the 'friend' (receiver)
         # and the status is 'pending'
-        return FriendTransaction.objects.filter(
-            friend=self.request.user,
-            status=FriendTransaction.StatusChoices.PENDING
+        return with_simple_users(
+            FriendTransaction.objects.filter(
+                friend=self.request.user,
+                status=FriendTransaction.StatusChoices.PENDING
+            ),
+            'initiator', 'friend', 'action_taken_by'
         )
 
 class TransactionActionView(generics.UpdateAPIView):
@@ -269,41 +362,59 @@ class TransactionActionView(generics.UpdateAPIView):
     API view for the 'friend' user to accept or reject a pending transaction.
     The URL for this view should include the transaction ID (pk).
     """
-    queryset = FriendTransaction.objects.all()
+    queryset = FriendTransaction.objects.select_related('initiator', 'friend', 'action_taken_by')
     serializer_class = TransactionStatusUpdateSerializer # Use simple status update serializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Ensure user can only act on transactions where they are the 'friend' and status is pending
-        return FriendTransaction.objects.filter(
-            friend=self.request.user,
-            status=FriendTransaction.StatusChoices.PENDING
+        return with_simple_users(
+            FriendTransaction.objects.filter(
+                friend=self.request.user,
+                status=FriendTransaction.StatusChoices.PENDING
+            ),
+            'initiator', 'friend', 'action_taken_by'
         )
 
     def update(self, request, *args, **kwargs):
-        transaction = self.get_object() # Gets specific transaction based on pk in URL
         serializer = self.get_serializer(data=request.data)
 
-        if serializer.is_valid(raise_exception=True):
-            new_status = serializer.validated_data['status']
-            if transaction.status == FriendTransaction.StatusChoices.PENDING:
-                transaction.status = new_status
-                transaction.action_taken_by = request.user # Record who took the action
-                transaction.save()
-                # Return the updated transaction details
-                return Response(FriendTransactionSerializer(transaction).data, status=status.HTTP_200_OK)
-            else:
-                 # Should not happen due to get_queryset
-                return Response({"detail": "This transaction is not pending."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        update_pending_or_404(
+            self.get_queryset(), kwargs['pk'],
+            "No pending transaction found with that ID.",
+            status=new_status,
+            action_taken_by=request.user # Record who took the action
+        )
+
+        # Return the updated transaction details
+        transaction = with_simple_users(
+            FriendTransaction.objects.filter(pk=kwargs['pk']), 'initiator', 'friend', 'action_taken_by'
+        ).get()
+        return Response(_transaction_out.to_representation(transaction), status=status.HTTP_200_OK)
+
+class TransactionHistoryPagination(CursorPagination):
+    """
+    Keyset pagination for a pair's history: each page is an index range scan
+    from the cursor, however long the history gets.
+    """
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
 
 class TransactionHistoryView(generics.ListAPIView):
     """
     API view to retrieve transaction history between the authenticated user
     and a specific friend.
-    Returns all transactions (pending, accepted, rejected) between the two users.
+    Returns all transactions (pending, accepted, rejected) between the two users,
+    newest first, one page at a time.
     """
     serializer_class = FriendTransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionHistoryPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -312,17 +423,27 @@ class TransactionHistoryView(generics.ListAPIView):
         if not friend_username:
             raise ValidationError("Friend username must be provided as a query parameter.")
         
-        try:
-            friend = User.objects.get(username=friend_username)
-        except User.DoesNotExist:
-            raise NotFound("Friend not found.")
+        # The friend is resolved inside the same SELECT as a scalar subquery,
+        # so the common case is a single round trip
+        friend = User.objects.filter(username=friend_username).values('pk')[:1]
         
         # Get all transactions between the two users (both directions)
-        transactions = FriendTransaction.objects.filter(
-            Q(initiator=user, friend=friend) | Q(initiator=friend, friend=user)
-        ).order_by('-created_at')
-        
+        transactions = with_simple_users(
+            FriendTransaction.objects.filter(
+                Q(initiator=user, friend=friend) | Q(initiator=friend, friend=user)
+            ),
+            'initiator', 'friend', 'action_taken_by'
+        )
+        # Ordered (newest first) by TransactionHistoryPagination
         return transactions
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # An empty first page is the only case where the friend may not exist
+        if (not response.data['results'] and not response.data['previous']
+                and not User.objects.filter(username=request.query_params['friend']).exists()):
+            raise NotFound("Friend not found.")
+        return response
 # --- Optional: View to see transactions YOU initiated that are still pending ---
 class SentPendingTransactionsView(generics.ListAPIView):
     """
@@ -332,9 +453,12 @@ class SentPendingTransactionsView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return FriendTransaction.objects.filter(
-            initiator=self.request.user,
-            status=FriendTransaction.StatusChoices.PENDING
+        return with_simple_users(
+            FriendTransaction.objects.filter(
+                initiator=self.request.user,
+                status=FriendTransaction.StatusChoices.PENDING
+            ),
+            'initiator', 'friend', 'action_taken_by'
         )
     
 # --- User Login View ---
@@ -356,7 +480,7 @@ class LoginView(generics.GenericAPIView):
         
         # Return the token and user info
         return Response({
-            "user": UserSerializer(user, context=self.get_serializer_context()).data,
+            "user": _user_out.to_representation(user),
             "token": token.key
         }, status=status.HTTP_200_OK)
     
@@ -381,7 +505,7 @@ class UserSearchView(generics.ListAPIView):
             username__icontains=username_query
         ).exclude(
             id=self.request.user.id
-        ).order_by('username')[:10]
+        ).only(*SIMPLE_USER_FIELDS).order_by('username')[:10]
     
 
 class RequestTransactionDeleteView(generics.CreateAPIView):
@@ -436,16 +560,15 @@ class PendingDeleteRequestsView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
         
-        # Get transactions where user is involved
-        user_transactions = FriendTransaction.objects.filter(
-            Q(initiator=user) | Q(friend=user)
+        # Delete requests for transactions the user is part of (joined, not an
+        # IN subquery) where user is NOT the requester
+        return with_simple_users(
+            TransactionDeleteRequest.objects.filter(
+                Q(transaction__initiator=user) | Q(transaction__friend=user),
+                status=TransactionDeleteRequest.StatusChoices.PENDING
+            ).exclude(requester=user),
+            'requester', 'transaction__initiator', 'transaction__friend', 'transaction__action_taken_by'
         )
-        
-        # Get delete requests for these transactions where user is NOT the requester
-        return TransactionDeleteRequest.objects.filter(
-            transaction__in=user_transactions,
-            status=TransactionDeleteRequest.StatusChoices.PENDING
-        ).exclude(requester=user)
 
 
 class DeleteRequestActionView(generics.UpdateAPIView):
@@ -460,39 +583,31 @@ class DeleteRequestActionView(generics.UpdateAPIView):
     def get_queryset(self):
         user = self.request.user
         
-        # Get transactions where user is involved
-        user_transactions = FriendTransaction.objects.filter(
-            Q(initiator=user) | Q(friend=user)
-        )
-        
         # Can only act on delete requests for their transactions (not created by them)
         return TransactionDeleteRequest.objects.filter(
-            transaction__in=user_transactions,
+            Q(transaction__initiator=user) | Q(transaction__friend=user),
             status=TransactionDeleteRequest.StatusChoices.PENDING
         ).exclude(requester=user)
 
     def update(self, request, *args, **kwargs):
-        delete_request = self.get_object()
         serializer = self.get_serializer(data=request.data)
         
-        if serializer.is_valid(raise_exception=True):
-            new_status = serializer.validated_data['status']
-            delete_request.status = new_status
-            delete_request.save()
-            
-            # If approved, delete the transaction permanently
-            if new_status == TransactionDeleteRequest.StatusChoices.APPROVED:
-                transaction = delete_request.transaction
-                transaction.delete()
-                return Response(
-                    {"detail": "Delete request approved. Transaction deleted."},
-                    status=status.HTTP_200_OK
-                )
-            else:
-                return Response(
-                    {"detail": "Delete request rejected."},
-                    status=status.HTTP_200_OK
-                )
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        # The approval and the deletion commit together
+        with atomic():
+            update_pending_or_404(
+                self.get_queryset(), kwargs['pk'],
+                "No pending delete request found with that ID.",
+                status=new_status
+            )
+
+            if new_status != TransactionDeleteRequest.StatusChoices.APPROVED:
+                return detail_response(_DELETE_REJECTED)
+
+            # Approved: delete the transaction permanently
+            FriendTransaction.objects.filter(delete_requests=kwargs['pk']).delete()
+        return detail_response(_DELETE_APPROVED)
 
 
 # ============================================
@@ -513,10 +628,8 @@ class RequestHistoryResetView(generics.CreateAPIView):
         if not friend_username:
             raise ValidationError("Friend username must be provided.")
         
-        try:
-            target_user = User.objects.get(username=friend_username)
-        except User.DoesNotExist:
-            raise NotFound("Friend not found.")
+        # Loads only the columns the response renders for target_user
+        target_user = get_user_by_username(friend_username, "Friend not found.")
         
         requester = self.request.user
         
@@ -525,8 +638,8 @@ class RequestHistoryResetView(generics.CreateAPIView):
         
         # Check if they are friends
         are_friends = Friendship.objects.filter(
-            (Q(requester=requester, receiver=target_user, status=Friendship.StatusChoices.ACCEPTED) |
-             Q(requester=target_user, receiver=requester, status=Friendship.StatusChoices.ACCEPTED))
+            Friendship.between(requester.id, target_user.id),
+            status=Friendship.StatusChoices.ACCEPTED
         ).exists()
         
         if not are_friends:
@@ -558,9 +671,12 @@ class PendingResetRequestsView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return HistoryResetRequest.objects.filter(
-            target_user=self.request.user,
-            status=HistoryResetRequest.StatusChoices.PENDING
+        return with_simple_users(
+            HistoryResetRequest.objects.filter(
+                target_user=self.request.user,
+                status=HistoryResetRequest.StatusChoices.PENDING
+            ),
+            'requester', 'target_user'
         )
 
 
@@ -580,35 +696,40 @@ class ResetRequestActionView(generics.UpdateAPIView):
         )
 
     def update(self, request, *args, **kwargs):
-        reset_request = self.get_object()
         serializer = self.get_serializer(data=request.data)
         
-        if serializer.is_valid(raise_exception=True):
-            new_status = serializer.validated_data['status']
-            reset_request.status = new_status
-            reset_request.save()
-            
-            # If approved, delete all ACCEPTED transactions between the two users
-            if new_status == HistoryResetRequest.StatusChoices.APPROVED:
-                requester = reset_request.requester
-                target = reset_request.target_user
-                
-                # Find all accepted transactions between them
-                transactions_to_delete = FriendTransaction.objects.filter(
-                    (Q(initiator=requester, friend=target) | 
-                     Q(initiator=target, friend=requester)),
-                    status=FriendTransaction.StatusChoices.ACCEPTED
-                )
-                
-                count = transactions_to_delete.count()
-                transactions_to_delete.delete()
-                
-                return Response(
-                    {"detail": f"History reset approved. {count} transactions deleted."},
-                    status=status.HTTP_200_OK
-                )
-            else:
-                return Response(
-                    {"detail": "History reset request rejected."},
-                    status=status.HTTP_200_OK
-                )
\ No newline at end of file
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        # The approval and the deletion commit together
+        with atomic():
+            update_pending_or_404(
+                self.get_queryset(), kwargs['pk'],
+                "No pending reset request found with that ID.",
+                status=new_status
+            )
+
+            if new_status != HistoryResetRequest.StatusChoices.APPROVED:
+                return detail_response(_RESET_REJECTED)
+
+            # Approved: delete all ACCEPTED transactions between the two users
+            requester = HistoryResetRequest.objects.filter(pk=kwargs['pk']).values_list(
+                'requester_id', flat=True
+            ).get()
+            target = request.user.id
+
+            # Find all accepted transactions between them
+            transactions_to_delete = FriendTransaction.objects.filter(
+                (Q(initiator=requester, friend=target) |
+                 Q(initiator=target, friend=requester)),
+                status=FriendTransaction.StatusChoices.ACCEPTED
+            )
+
+            # delete() reports per-model counts (cascaded delete requests are
+            # counted apart), so no separate COUNT query is needed
+            _, deleted = transactions_to_delete.delete()
+        count = deleted.get(FriendTransaction._meta.label, 0)
+
+        return Response(
+            {"detail": f"History reset approved. {count} transactions deleted."},
+            status=status.HTTP_200_OK
+        )
\ No newline at end of file
@@ -110,6 +110,24 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Login failure counters and friend lists are cached and invalidated by
+# whichever worker handles the write, so every worker process must see the
+# same cache (the default LocMemCache is per process). The file-based cache is
+# shared on one host; use Redis or Memcached when running on more than one.
+# Entries are unpickled on read, so the directory must only be writable by the
+# user running the project: it lives inside the project unless
+# DJANGO_CACHE_DIR points somewhere else.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -128,6 +146,18 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/#using-argon2-with-django
+# New passwords are stored with Argon2 (requires argon2-cffi); existing PBKDF2
+# hashes still verify and are upgraded on the user's next login.
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -160,4 +190,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated', # (Optional, sets default to protected)
     ],
+    # Used by views with throttle_scope set (register, change-password)
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': '5/min',
+    },
 }
\ No newline at end of file